@@ -7,15 +7,11 @@
  * It's useful to run before starting the application to ensure everything is configured correctly.
  */
 
-const fs = require('fs');
-const path = require('path');
-const dotenv = require('dotenv');
 const chalk = require('chalk');
+const { loadEnvLocal } = require('./mcp-utils');
 
 // Load environment variables from .env.local
-const envPath = path.resolve(process.cwd(), '.env.local');
-if (fs.existsSync(envPath)) {
-  dotenv.config({ path: envPath });
+if (loadEnvLocal()) {
   console.log(chalk.blue('Loaded environment variables from .env.local'));
 } else {
   console.warn(chalk.yellow('Warning: .env.local file not found. Using default values.'));
@@ -11,20 +11,22 @@
  * - Colored output and status indicators
  */
 
+const crypto = require('crypto');
 const http = require('http');
-const path = require('path');
-const fs = require('fs');
-const dotenv = require('dotenv');
 const chalk = require('chalk');
+const {
+  loadEnvLocal,
+  envPositiveInt,
+  envPort,
+  envFlag,
+  envInt,
+  isLogEnabled,
+  formatLogLine,
+  currentTimestamps,
+} = require('./mcp-utils');
 
-// Load environment variables from .env.local
-const envPath = path.resolve(process.cwd(), '.env.local');
-if (fs.existsSync(envPath)) {
-  dotenv.config({ path: envPath });
-  console.log(chalk.green('✓ Loaded environment variables from .env.local'));
-} else {
-  console.warn(chalk.yellow('⚠ Warning: .env.local file not found. Using default values.'));
-}
+// Load environment variables from .env.local (reported once the server name is known)
+const envLoaded = loadEnvLocal();
 
 // Get the server name from command line arguments
 const serverName = process.argv[2];
@@ -37,8 +39,8 @@ if (!serverName) {
 const mcpServers = {
   'heroku-mcp': {
     name: 'Heroku-MCP',
-    port: parseInt(process.env.HEROKU_MCP_PORT) || 3001,
-    enabled: process.env.ENABLE_HEROKU_MCP !== 'false',
+    port: envPort('HEROKU_MCP_PORT', 3001),
+    enabled: envFlag('ENABLE_HEROKU_MCP', true),
     requiresApiKey: false,
     apiKey: process.env.HEROKU_MCP_API_KEY,
     description: 'Cloud platform for hosting applications',
@@ -46,8 +48,8 @@ const mcpServers = {
   },
   'context7': {
     name: 'Context7',
-    port: parseInt(process.env.CONTEXT7_PORT) || 3002,
-    enabled: process.env.ENABLE_CONTEXT7 !== 'false',
+    port: envPort('CONTEXT7_PORT', 3002),
+    enabled: envFlag('ENABLE_CONTEXT7', true),
     requiresApiKey: false,
     apiKey: process.env.CONTEXT7_API_KEY,
     description: 'Context management system',
@@ -55,8 +57,8 @@ const mcpServers = {
   },
   'taskmaster': {
     name: 'Taskmaster (Claude)',
-    port: parseInt(process.env.TASKMASTER_PORT) || 3003,
-    enabled: process.env.ENABLE_TASKMASTER === 'true',
+    port: envPort('TASKMASTER_PORT', 3003),
+    enabled: envFlag('ENABLE_TASKMASTER', false),
     requiresApiKey: true,
     apiKey: process.env.TASKMASTER_API_KEY,
     description: 'AI-powered task management system',
@@ -65,12 +67,20 @@ const mcpServers = {
       apiKey: process.env.OPENROUTER_API_KEY,
       defaultModel: process.env.OPENROUTER_DEFAULT_MODEL || 'google/gemini-2.5-pro-exp-03-25',
       fallbackModel: process.env.OPENROUTER_FALLBACK_MODEL || 'mistralai/mistral-small-3.1-24b-instruct:free',
+      cacheTtlMs: envInt('AI_CACHE_TTL_MS', 600000),
+      cacheMaxEntries: 100,
+      timeoutMs: envPositiveInt('REQUEST_TIMEOUT_MS', 30000),
+      breakerFailureThreshold: 5,
+      breakerResetMs: 30000,
+      retryAttempts: 2,
+      retryDelayMs: 500,
+      retryAfterMaxMs: 10000,
     },
   },
   'magicui': {
     name: 'MagicUI',
-    port: parseInt(process.env.MAGICUI_PORT) || 3004,
-    enabled: process.env.ENABLE_MAGICUI === 'true',
+    port: envPort('MAGICUI_PORT', 3004),
+    enabled: envFlag('ENABLE_MAGICUI', false),
     requiresApiKey: true,
     apiKey: process.env.MAGICUI_API_KEY,
     description: 'UI component library and design system',
@@ -78,8 +88,8 @@ const mcpServers = {
   },
   'memory': {
     name: 'Memory',
-    port: parseInt(process.env.MEMORY_PORT) || 3005,
-    enabled: process.env.ENABLE_MEMORY !== 'false',
+    port: envPort('MEMORY_PORT', 3005),
+    enabled: envFlag('ENABLE_MEMORY', true),
     requiresApiKey: false,
     apiKey: process.env.MEMORY_API_KEY,
     description: 'Data storage and retrieval system',
@@ -87,8 +97,8 @@ const mcpServers = {
   },
   'knowledge': {
     name: 'Knowledge',
-    port: parseInt(process.env.KNOWLEDGE_PORT) || 3006,
-    enabled: process.env.ENABLE_KNOWLEDGE !== 'false',
+    port: envPort('KNOWLEDGE_PORT', 3006),
+    enabled: envFlag('ENABLE_KNOWLEDGE', true),
     requiresApiKey: false,
     apiKey: process.env.KNOWLEDGE_API_KEY,
     description: 'Knowledge base and information management system',
@@ -96,8 +106,8 @@ const mcpServers = {
   },
   'github-mcp': {
     name: 'GitHub MCP',
-    port: parseInt(process.env.GITHUB_MCP_PORT) || 3007,
-    enabled: process.env.ENABLE_GITHUB_MCP === 'true',
+    port: envPort('GITHUB_MCP_PORT', 3007),
+    enabled: envFlag('ENABLE_GITHUB_MCP', false),
     requiresApiKey: true,
     apiKey: process.env.GITHUB_MCP_API_KEY,
     description: 'GitHub integration and CI/CD management',
@@ -112,36 +122,93 @@ if (!serverConfig) {
   process.exit(1);
 }
 
+// Everything from here on goes through log(), so each line carries the server tag
+// when the launcher passes this output through
+if (envLoaded) {
+  log('Loaded environment variables from .env.local', 'success');
+} else {
+  log('.env.local file not found. Using default values.', 'warning');
+}
+
 // Check if the server is enabled
 if (!serverConfig.enabled) {
-  console.warn(chalk.yellow(`⚠ Warning: ${serverConfig.name} is disabled in configuration. Starting anyway for development.`));
+  log(`${serverConfig.name} is disabled in configuration. Starting anyway for development.`, 'warning');
 }
 
 // Check if API key is required but not provided
 if (serverConfig.requiresApiKey && !serverConfig.apiKey) {
-  console.warn(chalk.yellow(`⚠ Warning: ${serverConfig.name} requires an API key, but none is provided.`));
+  log(`${serverConfig.name} requires an API key, but none is provided.`, 'warning');
 }
 
-// OpenRouter integration for AI capabilities
-async function callOpenRouter(prompt, model = null) {
-  if (!serverConfig.openRouterConfig?.apiKey) {
-    throw new Error('OpenRouter API key not configured');
+// Header and URL values never change after startup, so build them once
+const expectedAuthorization = serverConfig.apiKey ? `Bearer ${serverConfig.apiKey}` : null;
+const openRouterApiUrl = (process.env.OPENROUTER_API_URL || 'https://openrouter.ai/api/v1').replace(/\/+$/, '');
+const openRouterChatUrl = `${openRouterApiUrl}/chat/completions`;
+const openRouterHeaders = serverConfig.openRouterConfig?.apiKey ? {
+  'Authorization': `Bearer ${serverConfig.openRouterConfig.apiKey}`,
+  'Content-Type': 'application/json',
+  'HTTP-Referer': 'http://localhost:3000',
+  'X-Title': 'Sunday School Transformation',
+} : null;
+
+// Circuit breaker: after repeated transient OpenRouter failures, fail fast until
+// breakerResetMs has passed, then let a single probe call through (half-open)
+const openRouterBreaker = { failures: 0, openedAt: 0, probing: false };
+
+function isOpenRouterCircuitOpen() {
+  if (openRouterBreaker.openedAt === 0) {
+    return false;
+  }
+  
+  // Everyone else keeps failing fast while the probe is in flight
+  if (openRouterBreaker.probing || Date.now() - openRouterBreaker.openedAt < serverConfig.openRouterConfig.breakerResetMs) {
+    return true;
   }
+  
+  openRouterBreaker.probing = true;
+  return false;
+}
 
-  const openRouterApiKey = serverConfig.openRouterConfig.apiKey;
-  const selectedModel = model || serverConfig.openRouterConfig.defaultModel;
+function recordOpenRouterResult(transientFailure) {
+  const wasProbing = openRouterBreaker.probing;
+  openRouterBreaker.probing = false;
   
+  if (!transientFailure) {
+    openRouterBreaker.failures = 0;
+    openRouterBreaker.openedAt = 0;
+    return;
+  }
+  
+  openRouterBreaker.failures++;
+  // A failed probe re-opens the circuit straight away
+  if (wasProbing || openRouterBreaker.failures >= serverConfig.openRouterConfig.breakerFailureThreshold) {
+    openRouterBreaker.openedAt = Date.now();
+    log(`OpenRouter circuit opened after ${openRouterBreaker.failures} consecutive failures`, 'warning');
+  }
+}
+
+// Retry-After is either delta-seconds or an HTTP date
+function parseRetryAfter(header) {
+  if (!header) {
+    return null;
+  }
+  
+  const seconds = Number(header);
+  const delay = Number.isFinite(seconds) ? seconds * 1000 : Date.parse(header) - Date.now();
+  return Number.isFinite(delay) ? Math.max(0, delay) : null;
+}
+
+// A single OpenRouter attempt. Failures are marked transient (network errors, timeouts,
+// 429s, 5xx and unreadable bodies) so callOpenRouter knows whether retrying can help.
+async function requestOpenRouter(prompt, model) {
+  let response;
   try {
-    const response = await fetch('https://openrouter.ai/api/v1/chat/completions', {
+    response = await fetch(openRouterChatUrl, {
       method: 'POST',
-      headers: {
-        'Authorization': `Bearer ${openRouterApiKey}`,
-        'Content-Type': 'application/json',
-        'HTTP-Referer': 'http://localhost:3000',
-        'X-Title': 'Sunday School Transformation',
-      },
+      headers: openRouterHeaders,
+      signal: AbortSignal.timeout(serverConfig.openRouterConfig.timeoutMs),
       body: JSON.stringify({
-        model: selectedModel,
+        model,
         messages: [
           {
             role: 'user',
@@ -152,49 +219,313 @@ async function callOpenRouter(prompt, model = null) {
         temperature: 0.7,
       }),
     });
+  } catch (error) {
+    error.transient = true;
+    throw error;
+  }
 
-    if (!response.ok) {
-      throw new Error(`OpenRouter API error: ${response.status} ${response.statusText}`);
-    }
+  if (!response.ok) {
+    // The error body is never read; release it so the connection can be reused
+    await response.body?.cancel().catch(() => {});
+    const error = new Error(`OpenRouter API error: ${response.status} ${response.statusText}`);
+    error.transient = response.status === 429 || response.status >= 500;
+    error.retryAfterMs = parseRetryAfter(response.headers.get('retry-after'));
+    throw error;
+  }
 
+  try {
     const data = await response.json();
-    return data.choices[0]?.message?.content || 'No response from AI';
+    return data.choices[0]?.message?.content || null;
   } catch (error) {
-    console.error(chalk.red(`OpenRouter API error: ${error.message}`));
+    // A body that stalls, resets or isn't a chat completion is still an upstream failure;
+    // it must count towards the breaker instead of resetting it like a success
+    error.transient = true;
+    throw error;
+  }
+}
+
+// OpenRouter integration for AI capabilities
+async function callOpenRouter(prompt, model = null) {
+  if (!openRouterHeaders) {
+    throw new Error('OpenRouter API key not configured');
+  }
+
+  if (isOpenRouterCircuitOpen()) {
+    const error = new Error('OpenRouter is unavailable after repeated failures, try again shortly');
+    error.statusCode = 503;
+    throw error;
+  }
+
+  const { defaultModel, fallbackModel, retryAttempts, retryDelayMs, retryAfterMaxMs } = serverConfig.openRouterConfig;
+  const selectedModel = model || defaultModel;
+  const candidateModels = selectedModel === fallbackModel ? [selectedModel] : [selectedModel, fallbackModel];
+  let lastError = null;
+  
+  for (const candidateModel of candidateModels) {
+    if (candidateModel !== selectedModel) {
+      log(`Trying fallback model: ${candidateModel}`, 'warning');
+    }
     
-    // Try fallback model if available
-    if (selectedModel !== serverConfig.openRouterConfig.fallbackModel) {
-      console.log(chalk.yellow(`Trying fallback model: ${serverConfig.openRouterConfig.fallbackModel}`));
-      return callOpenRouter(prompt, serverConfig.openRouterConfig.fallbackModel);
+    for (let retryCount = 0; ; retryCount++) {
+      try {
+        const content = await requestOpenRouter(prompt, candidateModel);
+        recordOpenRouterResult(false);
+        // Report which model answered, since the fallback may have stepped in
+        return { content, model: candidateModel };
+      } catch (error) {
+        lastError = error;
+        log(`OpenRouter request to ${candidateModel} failed: ${error.message}`, 'error');
+        
+        // Timeouts already used the whole time budget, so they go straight to the fallback
+        if (!error.transient || error.name === 'TimeoutError' || retryCount >= retryAttempts) {
+          break;
+        }
+        
+        // Honour Retry-After when given, otherwise back off exponentially with jitter
+        const delay = error.retryAfterMs !== null && error.retryAfterMs !== undefined
+          ? Math.min(error.retryAfterMs, retryAfterMaxMs)
+          : Math.round(retryDelayMs * 2 ** retryCount * (0.5 + Math.random() / 2));
+        log(`Retrying ${candidateModel} in ${delay}ms (${retryCount + 1}/${retryAttempts})`, 'warning');
+        await new Promise(resolve => setTimeout(resolve, delay));
+      }
+    }
+  }
+  
+  // The breaker counts failed requests, not attempts: one request with its retries and
+  // fallback is a single failure
+  recordOpenRouterResult(Boolean(lastError.transient));
+  throw lastError;
+}
+
+// Prompts are small; refuse to buffer anything larger than this
+const MAX_AI_REQUEST_BYTES = 1024 * 1024;
+
+// Buffer a request body as UTF-8, resolving null once it grows past maxBytes
+function readRequestBody(req, maxBytes) {
+  return new Promise((resolve, reject) => {
+    if (parseInt(req.headers['content-length'], 10) > maxBytes) {
+      req.resume();
+      resolve(null);
+      return;
     }
     
-    throw error;
+    const chunks = [];
+    let size = 0;
+    req.on('data', (chunk) => {
+      size += chunk.length;
+      if (size > maxBytes) {
+        req.removeAllListeners('data');
+        req.resume();
+        resolve(null);
+        return;
+      }
+      chunks.push(chunk);
+    });
+    req.on('end', () => resolve(Buffer.concat(chunks).toString('utf8')));
+    req.on('error', reject);
+  });
+}
+
+// Recent AI responses keyed by model and prompt, so repeated prompts skip the OpenRouter
+// round trip. Map iteration order doubles as LRU order.
+const aiResponseCache = new Map();
+
+// Prompts can be up to MAX_AI_REQUEST_BYTES, so keep a fixed-size digest instead of the text
+function aiCacheKey(prompt, model) {
+  return crypto.createHash('sha256').update(`${model}\n${prompt}`).digest('base64');
+}
+
+function getCachedAIResponse(prompt, model) {
+  const key = aiCacheKey(prompt, model);
+  const entry = aiResponseCache.get(key);
+  if (!entry) {
+    return null;
+  }
+  
+  aiResponseCache.delete(key);
+  if (Date.now() - entry.storedAt > serverConfig.openRouterConfig.cacheTtlMs) {
+    return null;
+  }
+  
+  aiResponseCache.set(key, entry);
+  return entry.response;
+}
+
+function cacheAIResponse(prompt, model, response) {
+  const { cacheTtlMs, cacheMaxEntries } = serverConfig.openRouterConfig;
+  if (cacheTtlMs <= 0) {
+    return;
+  }
+  
+  aiResponseCache.set(aiCacheKey(prompt, model), { response, storedAt: Date.now() });
+  if (aiResponseCache.size > cacheMaxEntries) {
+    aiResponseCache.delete(aiResponseCache.keys().next().value);
   }
 }
 
 // Enhanced logging function
 function log(message, type = 'info') {
-  const timestamp = new Date().toLocaleTimeString();
+  if (!isLogEnabled(type)) {
+    return;
+  }
+  
+  const timestamp = currentTimestamps().time;
   const prefix = `[${timestamp}] [${serverConfig.name}]`;
   
-  switch (type) {
-    case 'success':
-      console.log(chalk.green(`${prefix} ✓ ${message}`));
-      break;
-    case 'error':
-      console.log(chalk.red(`${prefix} ✗ ${message}`));
-      break;
-    case 'warning':
-      console.log(chalk.yellow(`${prefix} ⚠ ${message}`));
-      break;
-    case 'info':
-      console.log(chalk.blue(`${prefix} ℹ ${message}`));
-      break;
-    default:
-      console.log(`${prefix} ${message}`);
-  }
+  console.log(formatLogLine(prefix, message, type));
 }
 
+// Shared response header objects; writeHead only reads them
+const jsonHeaders = { 'Content-Type': 'application/json' };
+const htmlHeaders = { 'Content-Type': 'text/html' };
+const payloadTooLargeHeaders = { ...jsonHeaders, 'Connection': 'close' };
+
+// Response bodies that never change are serialized once. The health body only varies in
+// uptime and timestamp, so its static fields are kept as an open JSON object prefix.
+const healthBodyPrefix = JSON.stringify({
+  status: 'ok',
+  server: serverConfig.name,
+  port: serverConfig.port,
+  description: serverConfig.description,
+}).slice(0, -1);
+const unauthorizedBody = JSON.stringify({ error: 'Unauthorized. Invalid or missing API key.' });
+const notFoundBody = JSON.stringify({ error: 'Not found', server: serverConfig.name });
+
+// The dashboard only depends on the static server configuration, so render it once
+const rootPage = `
+  <!DOCTYPE html>
+  <html>
+    <head>
+      <title>${serverConfig.name} Server</title>
+      <style>
+        body { 
+          font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; 
+          max-width: 900px; 
+          margin: 0 auto; 
+          padding: 20px; 
+          background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+          color: #333;
+          min-height: 100vh;
+        }
+        .container {
+          background: white;
+          border-radius: 12px;
+          padding: 30px;
+          box-shadow: 0 10px 30px rgba(0,0,0,0.1);
+        }
+        h1 { 
+          color: #4a5568; 
+          margin-bottom: 10px;
+          font-size: 2.5em;
+        }
+        .description {
+          color: #718096;
+          font-size: 1.1em;
+          margin-bottom: 30px;
+        }
+        .status { 
+          padding: 20px; 
+          background: linear-gradient(135deg, #48bb78 0%, #38a169 100%);
+          border-radius: 8px;
+          color: white;
+          margin-bottom: 30px;
+        }
+        .endpoints { 
+          margin-top: 30px; 
+        }
+        .endpoint { 
+          margin-bottom: 15px; 
+          padding: 15px; 
+          background: #f7fafc; 
+          border-radius: 8px;
+          border-left: 4px solid #4299e1;
+        }
+        .method { 
+          font-weight: bold; 
+          display: inline-block; 
+          width: 80px;
+          color: #2b6cb0;
+        }
+        .ai-section {
+          background: linear-gradient(135deg, #ed8936 0%, #dd6b20 100%);
+          color: white;
+          padding: 20px;
+          border-radius: 8px;
+          margin: 20px 0;
+        }
+        .badge {
+          display: inline-block;
+          padding: 4px 8px;
+          border-radius: 4px;
+          font-size: 0.8em;
+          font-weight: bold;
+          margin-left: 10px;
+        }
+        .badge.success { background: #48bb78; color: white; }
+        .badge.warning { background: #ed8936; color: white; }
+        .badge.error { background: #f56565; color: white; }
+      </style>
+    </head>
+    <body>
+      <div class="container">
+        <h1>${serverConfig.name}</h1>
+        <div class="description">${serverConfig.description}</div>
+        
+        <div class="status">
+          <p><strong>Status:</strong> Running <span class="badge success">✓</span></p>
+          <p><strong>Port:</strong> ${serverConfig.port}</p>
+          <p><strong>API Key Required:</strong> ${serverConfig.requiresApiKey ? 'Yes' : 'No'} 
+            <span class="badge ${serverConfig.requiresApiKey && serverConfig.apiKey ? 'success' : serverConfig.requiresApiKey ? 'error' : 'warning'}">
+              ${serverConfig.requiresApiKey && serverConfig.apiKey ? '✓ Configured' : serverConfig.requiresApiKey ? '✗ Missing' : 'Not Required'}
+            </span>
+          </p>
+          ${serverConfig.openRouterConfig ? `
+            <p><strong>OpenRouter AI:</strong> Available 
+              <span class="badge ${serverConfig.openRouterConfig.apiKey ? 'success' : 'error'}">
+                ${serverConfig.openRouterConfig.apiKey ? '✓ Configured' : '✗ Missing API Key'}
+              </span>
+            </p>
+          ` : ''}
+        </div>
+        
+        ${serverConfig.openRouterConfig ? `
+          <div class="ai-section">
+            <h3>🤖 AI Capabilities</h3>
+            <p>This server has OpenRouter AI integration for enhanced functionality.</p>
+            <p><strong>Default Model:</strong> ${serverConfig.openRouterConfig.defaultModel}</p>
+            <p><strong>Fallback Model:</strong> ${serverConfig.openRouterConfig.fallbackModel}</p>
+            <p><strong>AI Endpoint:</strong> POST /api/ai/chat</p>
+          </div>
+        ` : ''}
+        
+        <div class="endpoints">
+          <h2>Available Endpoints:</h2>
+          <div class="endpoint">
+            <div><span class="method">GET</span> /health</div>
+            <div>Health check endpoint</div>
+          </div>
+          <div class="endpoint">
+            <div><span class="method">GET</span> /api/status</div>
+            <div>Get server status and capabilities</div>
+          </div>
+          ${serverConfig.openRouterConfig ? `
+            <div class="endpoint">
+              <div><span class="method">POST</span> /api/ai/chat</div>
+              <div>AI chat endpoint (requires prompt in JSON body)</div>
+            </div>
+          ` : ''}
+          ${serverConfig.endpoints.map(endpoint => `
+            <div class="endpoint">
+              <div><span class="method">GET</span> ${endpoint}</div>
+              <div>${endpoint.charAt(1).toUpperCase() + endpoint.slice(2)} functionality</div>
+            </div>
+          `).join('')}
+        </div>
+      </div>
+    </body>
+  </html>
+`;
+
 // Create an enhanced HTTP server
 const server = http.createServer(async (req, res) => {
   // Add CORS headers for development
@@ -209,20 +540,13 @@ const server = http.createServer(async (req, res) => {
     return;
   }
   
-  // Log incoming requests
-  log(`${req.method} ${req.url}`, 'info');
+  // Log incoming requests by path only; query strings may carry tokens
+  log(`${req.method} ${req.url.split('?')[0]}`, 'info');
   
   // Handle health check endpoint
   if (req.url === '/health') {
-    res.writeHead(200, { 'Content-Type': 'application/json' });
-    res.end(JSON.stringify({ 
-      status: 'ok', 
-      server: serverConfig.name,
-      port: serverConfig.port,
-      description: serverConfig.description,
-      uptime: process.uptime(),
-      timestamp: new Date().toISOString(),
-    }));
+    res.writeHead(200, jsonHeaders);
+    res.end(`${healthBodyPrefix},"uptime":${process.uptime()},"timestamp":"${currentTimestamps().iso}"}`);
     return;
   }
   
@@ -230,44 +554,62 @@ const server = http.createServer(async (req, res) => {
   if (req.url.startsWith('/api/ai/') && serverConfig.openRouterConfig) {
     try {
       // Check for API key if required
-      if (serverConfig.requiresApiKey) {
-        const authHeader = req.headers.authorization;
-        if (!authHeader || !authHeader.startsWith('Bearer ') || authHeader.substring(7) !== serverConfig.apiKey) {
-          res.writeHead(401, { 'Content-Type': 'application/json' });
-          res.end(JSON.stringify({ error: 'Unauthorized. Invalid or missing API key.' }));
-          return;
-        }
+      if (serverConfig.requiresApiKey && req.headers.authorization !== expectedAuthorization) {
+        res.writeHead(401, jsonHeaders);
+        res.end(unauthorizedBody);
+        return;
       }
       
       if (req.method === 'POST') {
-        let body = '';
-        req.on('data', chunk => body += chunk);
-        req.on('end', async () => {
+        readRequestBody(req, MAX_AI_REQUEST_BYTES).then(async (body) => {
+          if (body === null) {
+            res.writeHead(413, payloadTooLargeHeaders);
+            res.end(JSON.stringify({ error: `Request body exceeds ${MAX_AI_REQUEST_BYTES} bytes` }));
+            return;
+          }
+          
           try {
-            const { prompt, model } = JSON.parse(body);
-            if (!prompt) {
-              res.writeHead(400, { 'Content-Type': 'application/json' });
+            const { prompt, model, noCache } = JSON.parse(body);
+            // Blank or non-string prompts would only come back as an upstream error, so
+            // reject them before spending an OpenRouter call
+            if (typeof prompt !== 'string' || !prompt.trim()) {
+              res.writeHead(400, jsonHeaders);
               res.end(JSON.stringify({ error: 'Prompt is required' }));
               return;
             }
             
-            const aiResponse = await callOpenRouter(prompt, model);
-            res.writeHead(200, { 'Content-Type': 'application/json' });
+            const selectedModel = model || serverConfig.openRouterConfig.defaultModel;
+            let aiResponse = noCache ? null : getCachedAIResponse(prompt, selectedModel);
+            let answeredModel = selectedModel;
+            const cached = aiResponse !== null;
+            if (!cached) {
+              const result = await callOpenRouter(prompt, selectedModel);
+              answeredModel = result.model;
+              aiResponse = result.content ?? 'No response from AI';
+              // Only cache real answers from the requested model, so a fallback answer is
+              // never replayed for the primary model once it recovers
+              if (!noCache && result.content !== null && result.model === selectedModel) {
+                cacheAIResponse(prompt, selectedModel, aiResponse);
+              }
+            }
+            
+            res.writeHead(200, jsonHeaders);
             res.end(JSON.stringify({
               status: 'success',
               server: serverConfig.name,
               response: aiResponse,
-              model: model || serverConfig.openRouterConfig.defaultModel,
+              model: answeredModel,
+              cached,
             }));
           } catch (error) {
-            res.writeHead(500, { 'Content-Type': 'application/json' });
+            res.writeHead(error.statusCode || 500, jsonHeaders);
             res.end(JSON.stringify({ error: error.message }));
           }
-        });
+        }).catch(() => res.destroy());
         return;
       }
     } catch (error) {
-      res.writeHead(500, { 'Content-Type': 'application/json' });
+      res.writeHead(500, jsonHeaders);
       res.end(JSON.stringify({ error: error.message }));
       return;
     }
@@ -276,17 +618,14 @@ const server = http.createServer(async (req, res) => {
   // Handle API endpoints
   if (req.url.startsWith('/api/')) {
     // Check for API key if required
-    if (serverConfig.requiresApiKey) {
-      const authHeader = req.headers.authorization;
-      if (!authHeader || !authHeader.startsWith('Bearer ') || authHeader.substring(7) !== serverConfig.apiKey) {
-        res.writeHead(401, { 'Content-Type': 'application/json' });
-        res.end(JSON.stringify({ error: 'Unauthorized. Invalid or missing API key.' }));
-        return;
-      }
+    if (serverConfig.requiresApiKey && req.headers.authorization !== expectedAuthorization) {
+      res.writeHead(401, jsonHeaders);
+      res.end(unauthorizedBody);
+      return;
     }
     
     // Process the API request
-    res.writeHead(200, { 'Content-Type': 'application/json' });
+    res.writeHead(200, jsonHeaders);
     res.end(JSON.stringify({
       status: 'success',
       server: serverConfig.name,
@@ -302,148 +641,20 @@ const server = http.createServer(async (req, res) => {
   
   // Handle root endpoint with enhanced UI
   if (req.url === '/') {
-    res.writeHead(200, { 'Content-Type': 'text/html' });
-    res.end(`
-      <!DOCTYPE html>
-      <html>
-        <head>
-          <title>${serverConfig.name} Server</title>
-          <style>
-            body { 
-              font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; 
-              max-width: 900px; 
-              margin: 0 auto; 
-              padding: 20px; 
-              background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-              color: #333;
-              min-height: 100vh;
-            }
-            .container {
-              background: white;
-              border-radius: 12px;
-              padding: 30px;
-              box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-            }
-            h1 { 
-              color: #4a5568; 
-              margin-bottom: 10px;
-              font-size: 2.5em;
-            }
-            .description {
-              color: #718096;
-              font-size: 1.1em;
-              margin-bottom: 30px;
-            }
-            .status { 
-              padding: 20px; 
-              background: linear-gradient(135deg, #48bb78 0%, #38a169 100%);
-              border-radius: 8px;
-              color: white;
-              margin-bottom: 30px;
-            }
-            .endpoints { 
-              margin-top: 30px; 
-            }
-            .endpoint { 
-              margin-bottom: 15px; 
-              padding: 15px; 
-              background: #f7fafc; 
-              border-radius: 8px;
-              border-left: 4px solid #4299e1;
-            }
-            .method { 
-              font-weight: bold; 
-              display: inline-block; 
-              width: 80px;
-              color: #2b6cb0;
-            }
-            .ai-section {
-              background: linear-gradient(135deg, #ed8936 0%, #dd6b20 100%);
-              color: white;
-              padding: 20px;
-              border-radius: 8px;
-              margin: 20px 0;
-            }
-            .badge {
-              display: inline-block;
-              padding: 4px 8px;
-              border-radius: 4px;
-              font-size: 0.8em;
-              font-weight: bold;
-              margin-left: 10px;
-            }
-            .badge.success { background: #48bb78; color: white; }
-            .badge.warning { background: #ed8936; color: white; }
-            .badge.error { background: #f56565; color: white; }
-          </style>
-        </head>
-        <body>
-          <div class="container">
-            <h1>${serverConfig.name}</h1>
-            <div class="description">${serverConfig.description}</div>
-            
-            <div class="status">
-              <p><strong>Status:</strong> Running <span class="badge success">✓</span></p>
-              <p><strong>Port:</strong> ${serverConfig.port}</p>
-              <p><strong>API Key Required:</strong> ${serverConfig.requiresApiKey ? 'Yes' : 'No'} 
-                <span class="badge ${serverConfig.requiresApiKey && serverConfig.apiKey ? 'success' : serverConfig.requiresApiKey ? 'error' : 'warning'}">
-                  ${serverConfig.requiresApiKey && serverConfig.apiKey ? '✓ Configured' : serverConfig.requiresApiKey ? '✗ Missing' : 'Not Required'}
-                </span>
-              </p>
-              ${serverConfig.openRouterConfig ? `
-                <p><strong>OpenRouter AI:</strong> Available 
-                  <span class="badge ${serverConfig.openRouterConfig.apiKey ? 'success' : 'error'}">
-                    ${serverConfig.openRouterConfig.apiKey ? '✓ Configured' : '✗ Missing API Key'}
-                  </span>
-                </p>
-              ` : ''}
-            </div>
-            
-            ${serverConfig.openRouterConfig ? `
-              <div class="ai-section">
-                <h3>🤖 AI Capabilities</h3>
-                <p>This server has OpenRouter AI integration for enhanced functionality.</p>
-                <p><strong>Default Model:</strong> ${serverConfig.openRouterConfig.defaultModel}</p>
-                <p><strong>Fallback Model:</strong> ${serverConfig.openRouterConfig.fallbackModel}</p>
-                <p><strong>AI Endpoint:</strong> POST /api/ai/chat</p>
-              </div>
-            ` : ''}
-            
-            <div class="endpoints">
-              <h2>Available Endpoints:</h2>
-              <div class="endpoint">
-                <div><span class="method">GET</span> /health</div>
-                <div>Health check endpoint</div>
-              </div>
-              <div class="endpoint">
-                <div><span class="method">GET</span> /api/status</div>
-                <div>Get server status and capabilities</div>
-              </div>
-              ${serverConfig.openRouterConfig ? `
-                <div class="endpoint">
-                  <div><span class="method">POST</span> /api/ai/chat</div>
-                  <div>AI chat endpoint (requires prompt in JSON body)</div>
-                </div>
-              ` : ''}
-              ${serverConfig.endpoints.map(endpoint => `
-                <div class="endpoint">
-                  <div><span class="method">GET</span> ${endpoint}</div>
-                  <div>${endpoint.charAt(1).toUpperCase() + endpoint.slice(2)} functionality</div>
-                </div>
-              `).join('')}
-            </div>
-          </div>
-        </body>
-      </html>
-    `);
+    res.writeHead(200, htmlHeaders);
+    res.end(rootPage);
     return;
   }
   
   // Handle 404
-  res.writeHead(404, { 'Content-Type': 'application/json' });
-  res.end(JSON.stringify({ error: 'Not found', server: serverConfig.name }));
+  res.writeHead(404, jsonHeaders);
+  res.end(notFoundBody);
 });
 
+// Keep idle connections open longer than the 30s status-monitor interval so health
+// probes from start-all-mcp-servers.js can reuse their socket
+server.keepAliveTimeout = 65000;
+
 // Enhanced server startup with better error handling
 server.listen(serverConfig.port, () => {
   log(`Server is running on port ${serverConfig.port}`, 'success');
@@ -490,6 +701,8 @@ process.on('SIGINT', () => {
     log('Server stopped gracefully', 'success');
     process.exit(0);
   });
+  // Don't wait for pooled keep-alive sockets to time out
+  server.closeIdleConnections?.();
   
   // Force exit after 5 seconds
   setTimeout(() => {
@@ -504,4 +717,5 @@ process.on('SIGTERM', () => {
     log('Server stopped', 'success');
     process.exit(0);
   });
+  server.closeIdleConnections?.();
 }); 
\ No newline at end of file
@@ -0,0 +1,93 @@
+/**
+ * Shared MCP Script Helpers
+ *
+ * Common building blocks for mcp-server.js, start-all-mcp-servers.js and check-env.js:
+ * - .env.local loading
+ * - Typed environment variable lookups
+ * - LOG_LEVEL filtering and colored log formatting
+ * - Second-granular timestamps
+ */
+
+const path = require('path');
+const dotenv = require('dotenv');
+const chalk = require('chalk');
+
+// Load .env.local from the working directory; returns false when the file is missing.
+// LOG_LEVEL may come from the file, so the log level is re-read afterwards.
+function loadEnvLocal() {
+  const loaded = !dotenv.config({ path: path.resolve(process.cwd(), '.env.local') }).error;
+  minLogLevel = resolveLogLevel();
+  return loaded;
+}
+
+// Unset, non-numeric, zero and negative values fall back
+function envPositiveInt(name, fallback) {
+  const value = parseInt(process.env[name], 10);
+  return value > 0 ? value : fallback;
+}
+
+function envPort(name, fallback) {
+  return envPositiveInt(name, fallback);
+}
+
+// Flags that default on stay enabled unless set to 'false'; flags that default off need 'true'
+function envFlag(name, defaultValue) {
+  return defaultValue ? process.env[name] !== 'false' : process.env[name] === 'true';
+}
+
+// Unlike envPositiveInt, 0 is a meaningful value here; only unset or non-numeric values fall back
+function envInt(name, fallback) {
+  const value = parseInt(process.env[name], 10);
+  return Number.isFinite(value) ? value : fallback;
+}
+
+// LOG_LEVEL is one of debug, info, warn, error
+const LOG_LEVELS = { debug: 10, info: 20, warn: 30, error: 40 };
+const LOG_TYPE_LEVELS = { success: 'info', info: 'info', warning: 'warn', error: 'error' };
+
+function resolveLogLevel() {
+  return LOG_LEVELS[(process.env.LOG_LEVEL || '').toLowerCase()] ?? LOG_LEVELS.info;
+}
+
+let minLogLevel = resolveLogLevel();
+
+function isLogEnabled(type) {
+  return LOG_LEVELS[LOG_TYPE_LEVELS[type] || 'info'] >= minLogLevel;
+}
+
+const LOG_STYLES = {
+  success: { color: chalk.green, icon: '✓' },
+  error: { color: chalk.red, icon: '✗' },
+  warning: { color: chalk.yellow, icon: '⚠' },
+  info: { color: chalk.blue, icon: 'ℹ' },
+};
+
+function formatLogLine(prefix, message, type) {
+  const style = LOG_STYLES[type];
+  return style ? style.color(`${prefix} ${style.icon} ${message}`) : `${prefix} ${message}`;
+}
+
+// Log and health timestamps only change once per second, so format them at most that often
+const timestampCache = { second: -1, iso: '', time: '' };
+
+function currentTimestamps() {
+  const second = Math.floor(Date.now() / 1000);
+  if (second !== timestampCache.second) {
+    const now = new Date(second * 1000);
+    timestampCache.second = second;
+    timestampCache.iso = now.toISOString();
+    timestampCache.time = now.toLocaleTimeString();
+  }
+  return timestampCache;
+}
+
+module.exports = {
+  loadEnvLocal,
+  envPositiveInt,
+  envPort,
+  envFlag,
+  envInt,
+  isLogEnabled,
+  formatLogLine,
+  currentTimestamps,
+};
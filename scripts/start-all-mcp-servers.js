@@ -13,126 +13,118 @@
  */
 
 const { spawn } = require('child_process');
+const http = require('http');
+const net = require('net');
 const path = require('path');
-const fs = require('fs');
-const dotenv = require('dotenv');
 const chalk = require('chalk');
+const {
+  loadEnvLocal,
+  envPort,
+  envFlag,
+  isLogEnabled,
+  formatLogLine,
+  currentTimestamps,
+} = require('./mcp-utils');
 
 // Load environment variables from .env.local
-const envPath = path.resolve(process.cwd(), '.env.local');
-if (fs.existsSync(envPath)) {
-  dotenv.config({ path: envPath });
+if (loadEnvLocal()) {
   console.log(chalk.green('✓ Loaded environment variables from .env.local'));
 } else {
   console.warn(chalk.yellow('⚠ Warning: .env.local file not found. Using default values.'));
 }
 
+// Startup and health-check settings shared by every server unless overridden
+const serverDefaults = {
+  healthCheckPath: '/health',
+  startupDelay: 1000,
+  retryAttempts: 3,
+  retryDelay: 2000,
+};
+
 // Enhanced MCP Server configurations with better defaults
 const mcpServers = [
   {
+    ...serverDefaults,
     name: 'heroku-mcp',
     displayName: 'Heroku-MCP',
-    port: parseInt(process.env.HEROKU_MCP_PORT) || 3001,
-    enabled: process.env.ENABLE_HEROKU_MCP !== 'false',
+    port: envPort('HEROKU_MCP_PORT', 3001),
+    enabled: envFlag('ENABLE_HEROKU_MCP', true),
     requiresApiKey: false,
-    healthCheckPath: '/health',
-    startupDelay: 1000,
-    retryAttempts: 3,
-    retryDelay: 2000,
   },
   {
+    ...serverDefaults,
     name: 'context7',
     displayName: 'Context7',
-    port: parseInt(process.env.CONTEXT7_PORT) || 3002,
-    enabled: process.env.ENABLE_CONTEXT7 !== 'false',
+    port: envPort('CONTEXT7_PORT', 3002),
+    enabled: envFlag('ENABLE_CONTEXT7', true),
     requiresApiKey: false,
-    healthCheckPath: '/health',
-    startupDelay: 1000,
-    retryAttempts: 3,
-    retryDelay: 2000,
   },
   {
+    ...serverDefaults,
     name: 'taskmaster',
     displayName: 'Taskmaster (Claude)',
-    port: parseInt(process.env.TASKMASTER_PORT) || 3003,
-    enabled: process.env.ENABLE_TASKMASTER === 'true',
+    port: envPort('TASKMASTER_PORT', 3003),
+    enabled: envFlag('ENABLE_TASKMASTER', false),
     requiresApiKey: true,
-    healthCheckPath: '/health',
     startupDelay: 1500,
-    retryAttempts: 3,
-    retryDelay: 2000,
   },
   {
+    ...serverDefaults,
     name: 'magicui',
     displayName: 'MagicUI',
-    port: parseInt(process.env.MAGICUI_PORT) || 3004,
-    enabled: process.env.ENABLE_MAGICUI === 'true',
+    port: envPort('MAGICUI_PORT', 3004),
+    enabled: envFlag('ENABLE_MAGICUI', false),
     requiresApiKey: true,
-    healthCheckPath: '/health',
-    startupDelay: 1000,
-    retryAttempts: 3,
-    retryDelay: 2000,
   },
   {
+    ...serverDefaults,
     name: 'memory',
     displayName: 'Memory',
-    port: parseInt(process.env.MEMORY_PORT) || 3005,
-    enabled: process.env.ENABLE_MEMORY !== 'false',
+    port: envPort('MEMORY_PORT', 3005),
+    enabled: envFlag('ENABLE_MEMORY', true),
     requiresApiKey: false,
-    healthCheckPath: '/health',
-    startupDelay: 1000,
-    retryAttempts: 3,
-    retryDelay: 2000,
   },
   {
+    ...serverDefaults,
     name: 'knowledge',
     displayName: 'Knowledge',
-    port: parseInt(process.env.KNOWLEDGE_PORT) || 3006,
-    enabled: process.env.ENABLE_KNOWLEDGE !== 'false',
+    port: envPort('KNOWLEDGE_PORT', 3006),
+    enabled: envFlag('ENABLE_KNOWLEDGE', true),
     requiresApiKey: false,
-    healthCheckPath: '/health',
-    startupDelay: 1000,
-    retryAttempts: 3,
-    retryDelay: 2000,
   },
   {
+    ...serverDefaults,
     name: 'github-mcp',
     displayName: 'GitHub MCP',
-    port: parseInt(process.env.GITHUB_MCP_PORT) || 3007,
-    enabled: process.env.ENABLE_GITHUB_MCP === 'true',
+    port: envPort('GITHUB_MCP_PORT', 3007),
+    enabled: envFlag('ENABLE_GITHUB_MCP', false),
     requiresApiKey: true,
-    healthCheckPath: '/health',
     startupDelay: 1500,
-    retryAttempts: 3,
-    retryDelay: 2000,
   },
 ];
 
+// Health probes hit the same local ports every monitor cycle, so reuse their sockets
+const healthCheckAgent = new http.Agent({ keepAlive: true });
+
+// Piped children don't see a TTY, so pass our colour support on for their log output
+const childColorEnv = chalk.supportsColor && process.env.FORCE_COLOR === undefined
+  ? { FORCE_COLOR: String(chalk.supportsColor.level) }
+  : {};
+
 // Store child processes and their status
 const childProcesses = new Map();
 const serverStatus = new Map();
 
 // Utility functions
 function log(message, type = 'info') {
-  const timestamp = new Date().toLocaleTimeString();
+  if (!isLogEnabled(type)) {
+    return;
+  }
+  
+  const timestamp = currentTimestamps().time;
   const prefix = `[${timestamp}]`;
   
-  switch (type) {
-    case 'success':
-      console.log(chalk.green(`${prefix} ✓ ${message}`));
-      break;
-    case 'error':
-      console.log(chalk.red(`${prefix} ✗ ${message}`));
-      break;
-    case 'warning':
-      console.log(chalk.yellow(`${prefix} ⚠ ${message}`));
-      break;
-    case 'info':
-      console.log(chalk.blue(`${prefix} ℹ ${message}`));
-      break;
-    default:
-      console.log(`${prefix} ${message}`);
-  }
+  console.log(formatLogLine(prefix, message, type));
 }
 
 function logServer(serverName, message, type = 'info') {
@@ -141,8 +133,6 @@ function logServer(serverName, message, type = 'info') {
 
 // Enhanced port scanning with conflict resolution
 async function findAvailablePort(startPort) {
-  const net = require('net');
-  
   return new Promise((resolve) => {
     const server = net.createServer();
     
@@ -160,8 +150,6 @@ async function findAvailablePort(startPort) {
 
 // Health check function
 async function checkServerHealth(server, port) {
-  const http = require('http');
-  
   return new Promise((resolve) => {
     const options = {
       hostname: 'localhost',
@@ -169,9 +157,12 @@ async function checkServerHealth(server, port) {
       path: server.healthCheckPath,
       method: 'GET',
       timeout: 3000,
+      agent: healthCheckAgent,
     };
     
     const req = http.request(options, (res) => {
+      // Drain the body so the socket goes back to the keep-alive pool
+      res.resume();
       if (res.statusCode === 200) {
         resolve({ status: 'healthy', statusCode: res.statusCode });
       } else {
@@ -193,7 +184,7 @@ async function checkServerHealth(server, port) {
 }
 
 // Enhanced server startup with retry logic
-async function startMCPServer(server) {
+async function startMCPServer(server, retryCount = 0) {
   if (!server.enabled) {
     logServer(server.displayName, 'Server is disabled, skipping...', 'warning');
     return null;
@@ -214,7 +205,11 @@ async function startMCPServer(server) {
   const serverProcess = spawn('node', [path.join(__dirname, 'mcp-server.js'), server.name], {
     stdio: 'pipe',
     detached: false,
-    env: { ...process.env, [`${server.name.toUpperCase().replace('-', '_')}_PORT`]: actualPort.toString() }
+    env: {
+      ...process.env,
+      ...childColorEnv,
+      [`${server.name.toUpperCase().replace('-', '_')}_PORT`]: actualPort.toString(),
+    }
   });
   
   childProcesses.set(server.name, {
@@ -224,16 +219,12 @@ async function startMCPServer(server) {
     config: serverConfig,
     status: 'starting',
     startTime: Date.now(),
-    retryCount: 0,
+    retryCount,
   });
   
-  // Handle stdout
-  serverProcess.stdout.on('data', (data) => {
-    const output = data.toString().trim();
-    if (output) {
-      logServer(server.displayName, output, 'info');
-    }
-  });
+  // Handle stdout. The server already timestamps, tags and level-filters its own log lines,
+  // so pass them through untouched rather than decoding and logging them a second time.
+  serverProcess.stdout.pipe(process.stdout, { end: false });
   
   // Handle stderr
   serverProcess.stderr.on('data', (data) => {
@@ -270,50 +261,67 @@ async function startMCPServer(server) {
     logServer(server.displayName, `Health check failed: ${health.status}`, 'error');
     
     // Retry logic
-    const processInfo = childProcesses.get(server.name);
-    if (processInfo && processInfo.retryCount < server.retryAttempts) {
-      processInfo.retryCount++;
-      logServer(server.displayName, `Retrying... (${processInfo.retryCount}/${server.retryAttempts})`, 'warning');
+    if (retryCount < server.retryAttempts) {
+      // Exponential backoff with jitter so servers retrying together don't collide again
+      const delay = Math.round(server.retryDelay * 2 ** retryCount * (0.5 + Math.random() / 2));
+      logServer(server.displayName, `Retrying in ${delay}ms... (${retryCount + 1}/${server.retryAttempts})`, 'warning');
       
       // Kill the failed process
       serverProcess.kill();
       
       // Wait before retry
-      await new Promise(resolve => setTimeout(resolve, server.retryDelay));
+      await new Promise(resolve => setTimeout(resolve, delay));
       
       // Retry
-      return startMCPServer(server);
+      return startMCPServer(server, retryCount + 1);
     } else {
       logServer(server.displayName, 'Max retry attempts reached, giving up', 'error');
+      serverProcess.kill();
+      childProcesses.delete(server.name);
       return null;
     }
   }
 }
 
 // Enhanced shutdown function
+let shuttingDown = false;
+
 async function stopAllServers() {
+  // Repeated signals or errors during shutdown must not attach another round of listeners and timers
+  if (shuttingDown) {
+    return;
+  }
+  shuttingDown = true;
+  
   log('Shutting down all MCP servers...', 'info');
   
   const shutdownPromises = Array.from(childProcesses.values()).map(async (processInfo) => {
     const { name, displayName, process: serverProcess } = processInfo;
     
     return new Promise((resolve) => {
-      logServer(displayName, 'Stopping server...', 'info');
-      
-      serverProcess.on('close', () => {
-        logServer(displayName, 'Server stopped', 'success');
+      // A server that already exited will never emit 'close' again
+      if (serverProcess.exitCode !== null || serverProcess.signalCode !== null) {
         resolve();
-      });
+        return;
+      }
       
-      serverProcess.kill('SIGTERM');
+      logServer(displayName, 'Stopping server...', 'info');
       
       // Force kill after 5 seconds
-      setTimeout(() => {
-        if (!serverProcess.killed) {
+      const forceKillTimer = setTimeout(() => {
+        if (serverProcess.exitCode === null && serverProcess.signalCode === null) {
           serverProcess.kill('SIGKILL');
           logServer(displayName, 'Server force killed', 'warning');
         }
       }, 5000);
+      
+      serverProcess.on('close', () => {
+        clearTimeout(forceKillTimer);
+        logServer(displayName, 'Server stopped', 'success');
+        resolve();
+      });
+      
+      serverProcess.kill('SIGTERM');
     });
   });
   
@@ -328,17 +336,22 @@ function startStatusMonitoring() {
     const runningServers = Array.from(childProcesses.values()).filter(p => p.status === 'running');
     
     if (runningServers.length > 0) {
+      // Probe every server concurrently so one slow server doesn't delay the rest
+      const healthResults = await Promise.all(
+        runningServers.map(processInfo => checkServerHealth(processInfo.config, processInfo.config.port))
+      );
+      
       console.log(chalk.cyan('\n' + '='.repeat(60)));
       console.log(chalk.cyan('MCP Server Status Monitor'));
       console.log(chalk.cyan('='.repeat(60)));
       
-      for (const processInfo of runningServers) {
-        const health = await checkServerHealth(processInfo.config, processInfo.config.port);
+      runningServers.forEach((processInfo, index) => {
+        const health = healthResults[index];
         const status = health.status === 'healthy' ? chalk.green('✓ Healthy') : chalk.red('✗ Unhealthy');
         const uptime = Math.floor((Date.now() - processInfo.startTime) / 1000);
         
         console.log(`${chalk.blue(processInfo.displayName.padEnd(20))} ${status} | Port: ${processInfo.config.port} | Uptime: ${uptime}s`);
-      }
+      });
       console.log(chalk.cyan('='.repeat(60)));
     }
   }, 30000); // Check every 30 seconds